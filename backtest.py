@@ -1,7 +1,7 @@
-import ccxt
 import csv
 from datetime import datetime, timedelta
 import pytz
+import gateway
 import time
 
 # === Config ===
@@ -89,8 +89,7 @@ def simulate_trade(prices, setup):
     return None  # Neither hit
 
 def main():
-    dex = ccxt.hyperliquid({'enableRateLimit': True})
-    dex.load_markets()
+    dex = gateway.get_exchange('hyperliquid')
     now = datetime.now(IST)
     start_date = datetime(2025, 6, 29, 0, 0, 0, tzinfo=IST)
     results = []
@@ -1,7 +1,11 @@
-import ccxt
 import csv
+import sys
 from datetime import datetime, timedelta
+import numpy as np
 import pytz
+import gateway
+from candle_store import load_candles
+from l2book import BookReplay
 import matplotlib.pyplot as plt
 
 # === Config ===
@@ -13,8 +17,14 @@ REWARD = 20
 MARGIN = 150
 LEVERAGE = 40
 MAX_POSITION_VALUE = MARGIN * LEVERAGE
+# Fees of the venue being modelled: the strategy is a 40x perp strategy, slippage comes
+# from recorded Hyperliquid perp books and the live bot trades Hyperliquid perps
+TAKER_FEE = 0.00045  # Hyperliquid perp base tier
+MAKER_FEE = 0.00015
 START_HOUR = 8   # 8:00 AM IST
 END_HOUR = 23    # 11:00 PM IST (last candle will be 23:55)
+DAY_MS = 86_400_000
+CANDLE_MS = 5 * 60 * 1000  # breakouts are seen on the close of a 5m candle
 
 # === Candle Analysis ===
 def analyze_candle(candle):
@@ -53,17 +63,22 @@ def fetch_all_ohlcv(dex, symbol, timeframe, since, until):
         print(f"Warning: Only fetched {len(all_candles)} candles, expected about {expected_candles}. Data may be limited by Binance.")
     return all_candles
 
-def main():
-    dex = ccxt.binance({'enableRateLimit': True})
-    dex.load_markets()
-    now = datetime.now(IST)
-    start_date = (now - timedelta(days=90)).replace(hour=0, minute=0, second=0, microsecond=0)
-    end_date = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-    since = int(start_date.timestamp() * 1000)
-    until = int(end_date.timestamp() * 1000)
-    print(f"Fetching 5m candles from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}...")
-    candles = fetch_all_ohlcv(dex, SYMBOL, TIMEFRAME, since, until)
-    print(f"Fetched {len(candles)} candles.")
+def iter_days(candles):
+    """Yield (day, candles of that IST day) in date order.
+
+    A candle-store array (possibly memory-mapped) is split on day boundaries and
+    only one day at a time is turned into Python lists.
+    """
+    if isinstance(candles, np.ndarray):
+        if len(candles) == 0:
+            return
+        offset_ms = IST.utcoffset(datetime(2000, 1, 1)).total_seconds() * 1000  # IST has no DST
+        days = (np.asarray(candles[:, 0]) + offset_ms) // DAY_MS
+        bounds = (np.flatnonzero(np.diff(days)) + 1).tolist()
+        for start, end in zip([0] + bounds, bounds + [len(candles)]):
+            day_candles = candles[start:end].tolist()
+            yield datetime.fromtimestamp(day_candles[0][0] / 1000, IST).strftime('%Y-%m-%d'), day_candles
+        return
     # Organize candles by day
     candles_by_day = {}
     for c in candles:
@@ -72,10 +87,41 @@ def main():
         if day_str not in candles_by_day:
             candles_by_day[day_str] = []
         candles_by_day[day_str].append(c)
+    for day_str in sorted(candles_by_day.keys()):
+        yield day_str, candles_by_day[day_str]
+
+def trade_costs(direction, entry, qty, result, stop, target, entry_ts, exit_ts, book=None, taker_fee=TAKER_FEE, maker_fee=MAKER_FEE):
+    """Fees and slippage in $ for one trade.
+
+    With an `l2book.BookReplay`, the market entry and a stop exit walk the book
+    at the close of the candle that crossed the level. Only the book's own
+    impact (average fill minus top of book) is added to the level, so a fill is
+    never better than `entry`/`stop` and price differences between venues do
+    not leak in. The TP rests as a limit order, so it never slips.
+    """
+    entry_side = 'buy' if direction == 'LONG' else 'sell'
+    exit_side = 'sell' if direction == 'LONG' else 'buy'
+    level = stop if result == 'SL' else target
+    entry_impact = exit_impact = 0.0
+    if book is not None:
+        entry_impact = book.advance_to(entry_ts).impact(entry_side, qty)
+        if result == 'SL':
+            exit_impact = book.advance_to(exit_ts).impact(exit_side, qty)
+    sign = 1 if direction == 'LONG' else -1
+    entry_fill = entry + sign * entry_impact
+    exit_fill = level - sign * exit_impact
+    fee = qty * (entry_fill * taker_fee + exit_fill * (taker_fee if result == 'SL' else maker_fee))
+    slippage = qty * (entry_impact + exit_impact)
+    return fee, slippage
+
+def run_backtest(candles, book=None, taker_fee=TAKER_FEE, maker_fee=MAKER_FEE):
+    """Run the strategy over 5m candles (ccxt OHLCV rows or a candle-store array) and return the result rows.
+
+    `taker_fee`/`maker_fee` should match the venue of `book` when one is given.
+    """
     results = []
     account_balance = 150  # Start with $150
-    for day_str in sorted(candles_by_day.keys()):
-        day_candles = candles_by_day[day_str]
+    for day_str, day_candles in iter_days(candles):
         # Set up day_start and day_end for filtering
         day_start = IST.localize(datetime.strptime(day_str, '%Y-%m-%d')).replace(hour=START_HOUR, minute=0, second=0, microsecond=0)
         day_end = IST.localize(datetime.strptime(day_str, '%Y-%m-%d')).replace(hour=END_HOUR, minute=55, second=0, microsecond=0)
@@ -167,7 +213,8 @@ def main():
                 if result is None:
                     i += 1
                     continue
-                pnl = REWARD if result == 'TP' else -RISK
+                fee, slippage = trade_costs(direction, entry, qty, result, stop, target, day_candles[entry_idx][0] + CANDLE_MS, day_candles[exit_idx][0] + CANDLE_MS, book, taker_fee, maker_fee)
+                pnl = (REWARD if result == 'TP' else -RISK) - fee - slippage
                 account_balance += pnl
                 trade_count += 1
                 if result == 'SL':
@@ -184,6 +231,8 @@ def main():
                     'target': target,
                     'qty': qty,
                     'result': result,
+                    'fee': fee,
+                    'slippage': slippage,
                     'pnl': pnl,
                     'balance': account_balance
                 })
@@ -194,9 +243,33 @@ def main():
             else:
                 i += 1
         if trade_count == 0:
-            results.append({'date': day_str, 'trade_num': '', 'pattern_time': '', 'direction': '', 'entry': '', 'stop': '', 'target': '', 'qty': '', 'result': 'NoPattern', 'pnl': 0, 'balance': account_balance})
+            results.append({'date': day_str, 'trade_num': '', 'pattern_time': '', 'direction': '', 'entry': '', 'stop': '', 'target': '', 'qty': '', 'result': 'NoPattern', 'fee': '', 'slippage': '', 'pnl': 0, 'balance': account_balance})
+    return results
+
+def main():
+    # python backtest_binance.py [candles.npy|candles.csv] [l2_book.jsonl] runs offline from a candle store,
+    # optionally filling market entries and stops against a recorded L2 book
+    if len(sys.argv) > 1:
+        candles = load_candles(sys.argv[1])
+        print(f"Loaded {len(candles)} candles from {sys.argv[1]}")
+    else:
+        dex = gateway.get_exchange('binance')
+        now = datetime.now(IST)
+        start_date = (now - timedelta(days=90)).replace(hour=0, minute=0, second=0, microsecond=0)
+        end_date = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        since = int(start_date.timestamp() * 1000)
+        until = int(end_date.timestamp() * 1000)
+        print(f"Fetching 5m candles from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}...")
+        candles = fetch_all_ohlcv(dex, SYMBOL, TIMEFRAME, since, until)
+        print(f"Fetched {len(candles)} candles.")
+    book = BookReplay(sys.argv[2]) if len(sys.argv) > 2 else None
+    try:
+        results = run_backtest(candles, book)
+    finally:
+        if book is not None:
+            book.close()
     with open('backtest_binance_results.csv', 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['date', 'trade_num', 'pattern_time', 'direction', 'entry', 'stop', 'target', 'qty', 'result', 'pnl', 'balance'])
+        writer = csv.DictWriter(f, fieldnames=['date', 'trade_num', 'pattern_time', 'direction', 'entry', 'stop', 'target', 'qty', 'result', 'fee', 'slippage', 'pnl', 'balance'])
         writer.writeheader()
         for row in results:
             writer.writerow(row)
@@ -0,0 +1,30 @@
+import csv
+
+import numpy as np
+
+# === Format ===
+# One float64 row per candle in ccxt OHLCV order. Millisecond timestamps are
+# exact in float64, so the whole store is a single (n, 6) array: `.npy` files
+# are memory-mapped on load, `.csv` is kept for small, human-readable fixtures.
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+def save_candles(path, candles):
+    candles = np.asarray(candles, dtype=np.float64).reshape(-1, len(COLUMNS))
+    if str(path).endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for row in candles:
+                writer.writerow([int(row[0])] + [repr(float(x)) for x in row[1:]])
+    else:
+        np.save(path, candles)
+
+def open_candle_store(path, n_rows):
+    """Create a `.npy` store of `n_rows` candles and return it as a writable memmap."""
+    return np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(n_rows, len(COLUMNS)))
+
+def load_candles(path, mmap=True):
+    """Load a store as an (n, 6) array; `.npy` stores are memory-mapped by default."""
+    if str(path).endswith('.csv'):
+        return np.loadtxt(path, delimiter=',', skiprows=1, dtype=np.float64, ndmin=2)
+    return np.load(path, mmap_mode='r' if mmap else None)
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+
+import ccxt
+import ccxt.async_support as ccxt_async
+
+# === Logging ===
+logger = logging.getLogger(__name__)
+
+# === Config ===
+GATEWAY_HOST = os.getenv('GATEWAY_HOST', '127.0.0.1')
+GATEWAY_PORT = int(os.getenv('GATEWAY_PORT', '8765'))
+EXCHANGES = ('hyperliquid', 'binance')
+CONNECT_TIMEOUT = 1.0
+READ_TIMEOUT = 120.0  # a stalled gateway must not block the caller forever
+
+# === Gateway (server side) ===
+class MarketDataGateway:
+    """Owns one pooled exchange client per exchange and serves OHLCV over a local socket.
+
+    Every request goes through the same ccxt instance, so its rate limiter is the
+    global budget for all connected backtests and bots. Identical requests that
+    arrive while one is already in flight share its result instead of hitting
+    the exchange again.
+    """
+
+    def __init__(self):
+        self.exchanges = {}
+        self.in_flight = {}
+        self.stats = {'requests': 0, 'coalesced': 0, 'fetched': 0}
+
+    async def get_exchange(self, exchange_id):
+        if exchange_id not in EXCHANGES:
+            raise ValueError(f"Unsupported exchange: {exchange_id}")
+        dex = self.exchanges.get(exchange_id)
+        if dex is None:
+            dex = getattr(ccxt_async, exchange_id)({'enableRateLimit': True})
+            self.exchanges[exchange_id] = dex
+            await dex.load_markets()
+            logger.info(f"[Gateway] Connected to {exchange_id}")
+        return dex
+
+    async def fetch_ohlcv(self, exchange_id, symbol, timeframe, since=None, limit=None):
+        self.stats['requests'] += 1
+        key = (exchange_id, symbol, timeframe, since, limit)
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(self._fetch(key))
+        self.in_flight[key] = task
+        task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key):
+        exchange_id, symbol, timeframe, since, limit = key
+        dex = await self.get_exchange(exchange_id)
+        self.stats['fetched'] += 1
+        return await dex.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+
+    async def handle_request(self, request):
+        method = request.get('method')
+        if method == 'fetch_ohlcv':
+            candles = await self.fetch_ohlcv(
+                request.get('exchange', 'hyperliquid'),
+                request['symbol'],
+                request['timeframe'],
+                since=request.get('since'),
+                limit=request.get('limit'),
+            )
+            return {'ok': True, 'result': candles}
+        if method == 'stats':
+            return {'ok': True, 'result': dict(self.stats, in_flight=len(self.in_flight))}
+        return {'ok': False, 'error': f"Unknown method: {method}"}
+
+    async def handle_client(self, reader, writer):
+        # One JSON request per line, one JSON response per line
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.handle_request(json.loads(line))
+                except Exception as e:
+                    logger.error(f"[Gateway] Request error: {e}")
+                    response = {'ok': False, 'error': str(e)}
+                writer.write((json.dumps(response) + '\n').encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        for dex in self.exchanges.values():
+            await dex.close()
+        self.exchanges.clear()
+
+    async def serve(self, host=GATEWAY_HOST, port=GATEWAY_PORT):
+        server = await asyncio.start_server(self.handle_client, host, port, limit=2 ** 26)
+        logger.info(f"[Gateway] Listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+# === Client side ===
+class GatewayClient:
+    """Drop-in replacement for a ccxt exchange's `fetch_ohlcv`, backed by the gateway.
+
+    The socket is opened lazily and reopened after any socket error, so a
+    gateway restart costs one retry instead of breaking the client for good.
+    While the gateway is unreachable, calls go to a local ccxt client instead.
+    """
+
+    def __init__(self, exchange_id, host=GATEWAY_HOST, port=GATEWAY_PORT, timeout=READ_TIMEOUT):
+        self.exchange_id = exchange_id
+        self.address = (host, port)
+        self.timeout = timeout
+        self.sock = None
+        self.file = None
+        self.local = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        self.sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+        self.sock.settimeout(self.timeout)
+        self.file = self.sock.makefile('rb')
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.file.close()
+            self.sock.close()
+        self.sock = None
+        self.file = None
+
+    def _roundtrip(self, request):
+        if self.sock is None:
+            self._connect()
+        self.sock.sendall((json.dumps(request) + '\n').encode())
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Market-data gateway closed the connection")
+        return line
+
+    def _local_exchange(self):
+        if self.local is None:
+            logger.info(f"[Gateway] Not reachable, using a local {self.exchange_id} client")
+            self.local = getattr(ccxt, self.exchange_id)({'enableRateLimit': True})
+            self.local.load_markets()
+        return self.local
+
+    def _call(self, request, fallback=None):
+        with self.lock:
+            line = None
+            # One retry on a fresh connection covers a gateway restart
+            for _ in range(2):
+                try:
+                    line = self._roundtrip(request)
+                    break
+                except OSError as e:
+                    # Also drops a late reply to a timed-out request
+                    self._disconnect()
+                    error = e
+            if line is None:
+                if fallback is None:
+                    raise error
+                return fallback(self._local_exchange())
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise ccxt.ExchangeError(response.get('error'))
+        return response['result']
+
+    def load_markets(self):
+        # Markets live in the gateway process; nothing to load locally
+        return None
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        request = {
+            'method': 'fetch_ohlcv',
+            'exchange': self.exchange_id,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'since': since,
+            'limit': limit,
+        }
+        return self._call(request, lambda dex: dex.fetch_ohlcv(symbol, timeframe, since=since, limit=limit))
+
+    def stats(self):
+        return self._call({'method': 'stats'})
+
+    def close(self):
+        with self.lock:
+            self._disconnect()
+
+def get_exchange(exchange_id):
+    """Return a gateway-backed client; it falls back to a local ccxt instance whenever the gateway is down."""
+    return GatewayClient(exchange_id)
+
+# === Main ===
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    gateway = MarketDataGateway()
+    try:
+        asyncio.run(gateway.serve())
+    except KeyboardInterrupt:
+        logger.info("[Gateway] Stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import sys
+from bisect import bisect_left, insort
+
+# === Logging ===
+logger = logging.getLogger(__name__)
+
+# === Config ===
+SNAPSHOT_EVERY = 1000  # recorder writes a full snapshot every N messages, deltas in between
+
+# === Order Book ===
+class L2Book:
+    """Price-level book: a dict of size per price plus a sorted price list per side.
+
+    Size changes at an existing level are a dict write. Adding or removing a
+    level is a binary search plus a list insert/delete, which for books of a few
+    hundred levels is a short memmove and faster than a tree in pure Python.
+    """
+
+    def __init__(self, coin=None):
+        self.coin = coin
+        self.time = None
+        self.bids = {}
+        self.asks = {}
+        self.bid_prices = []  # ascending, best bid last
+        self.ask_prices = []  # ascending, best ask first
+
+    def set_level(self, is_bid, px, sz):
+        levels, prices = (self.bids, self.bid_prices) if is_bid else (self.asks, self.ask_prices)
+        if sz > 0:
+            if px not in levels:
+                insort(prices, px)
+            levels[px] = sz
+        elif levels.pop(px, None) is not None:
+            del prices[bisect_left(prices, px)]
+
+    def apply_snapshot(self, data):
+        """Replace the book with a Hyperliquid `l2Book` message payload."""
+        bids, asks = data["levels"]
+        self.bids = {float(level["px"]): float(level["sz"]) for level in bids}
+        self.asks = {float(level["px"]): float(level["sz"]) for level in asks}
+        self.bid_prices = sorted(self.bids)
+        self.ask_prices = sorted(self.asks)
+        self.time = data.get("time")
+
+    def apply_delta(self, data):
+        """Apply an `l2Delta` payload: [px, sz] pairs per side, sz 0 removes the level."""
+        set_level = self.set_level
+        for px, sz in data.get("bids", ()):
+            set_level(True, px, sz)
+        for px, sz in data.get("asks", ()):
+            set_level(False, px, sz)
+        self.time = data.get("time")
+
+    def diff(self, other):
+        """Delta payload that turns this book into `other`."""
+        bids = [[px, 0.0] for px in self.bids if px not in other.bids]
+        bids += [[px, sz] for px, sz in other.bids.items() if self.bids.get(px) != sz]
+        asks = [[px, 0.0] for px in self.asks if px not in other.asks]
+        asks += [[px, sz] for px, sz in other.asks.items() if self.asks.get(px) != sz]
+        return {"coin": other.coin, "time": other.time, "bids": bids, "asks": asks}
+
+    def best_bid(self):
+        return self.bid_prices[-1] if self.bid_prices else None
+
+    def best_ask(self):
+        return self.ask_prices[0] if self.ask_prices else None
+
+    def mid(self):
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        return (self.bid_prices[-1] + self.ask_prices[0]) / 2
+
+    def walk(self, side, qty):
+        """Walk the book for a market order. Returns (average price, filled qty, worst price touched)."""
+        if side == 'buy':
+            levels, prices = self.asks, self.ask_prices
+        else:
+            levels, prices = self.bids, reversed(self.bid_prices)
+        remaining = qty
+        cost = 0.0
+        px = None
+        for px in prices:
+            take = min(remaining, levels[px])
+            cost += take * px
+            remaining -= take
+            if remaining <= 0:
+                break
+        filled = qty - max(remaining, 0.0)
+        return (cost / filled if filled else None), filled, px
+
+    def impact(self, side, qty):
+        """Price impact of a market order: average fill minus the top of the book, always >= 0.
+
+        Anything beyond visible depth is priced at the worst level. An empty book
+        (no data yet) has no impact.
+        """
+        top = self.best_ask() if side == 'buy' else self.best_bid()
+        avg, filled, worst = self.walk(side, qty)
+        if not filled:
+            return 0.0
+        if filled < qty:
+            avg = (avg * filled + worst * (qty - filled)) / qty
+        return max(avg - top if side == 'buy' else top - avg, 0.0)
+
+# === Replay ===
+class BookReplay:
+    """Replays a recorded JSONL file of `l2Book` snapshots and `l2Delta` deltas for one coin.
+
+    `advance_to(ts)` applies every update up to `ts` (ms) and returns the book.
+    Time only moves forward; asking for an earlier time returns the current book.
+    """
+
+    def __init__(self, path, coin=None):
+        self.book = L2Book(coin)
+        self.file = open(path)
+        self.pending = None
+        self.updates = 0
+
+    def _next(self):
+        for line in self.file:
+            message = json.loads(line)
+            data = message["data"]
+            if self.book.coin is None:
+                self.book.coin = data["coin"]
+            if data["coin"] == self.book.coin:
+                return message
+        return None
+
+    def advance_to(self, ts):
+        book = self.book
+        message = self.pending or self._next()
+        while message is not None and message["data"]["time"] <= ts:
+            if message["channel"] == "l2Book":
+                book.apply_snapshot(message["data"])
+            else:
+                book.apply_delta(message["data"])
+            self.updates += 1
+            message = self._next()
+        self.pending = message
+        return book
+
+    def close(self):
+        self.file.close()
+
+# === Recorder ===
+async def record(coin, path, mainnet=True):
+    """Record Hyperliquid `l2Book` pushes for a coin as JSONL: periodic snapshots, deltas in between."""
+    # Only the recorder needs a connection; replaying in backtests must work without websockets
+    import websockets
+    url = "wss://api.hyperliquid.xyz/ws" if mainnet else "wss://api.hyperliquid-testnet.xyz/ws"
+    previous = None
+    count = 0
+    with open(path, 'a') as f:
+        while True:
+            try:
+                async with websockets.connect(url) as ws:
+                    await ws.send(json.dumps({"method": "subscribe", "subscription": {"type": "l2Book", "coin": coin}}))
+                    logger.info(f"[L2] Recording {coin} book to {path}")
+                    previous = None  # resync with a snapshot after every (re)connect
+                    async for message in ws:
+                        data = json.loads(message)
+                        if data.get("channel") != "l2Book":
+                            continue
+                        book = L2Book(coin)
+                        book.apply_snapshot(data["data"])
+                        if previous is None or count % SNAPSHOT_EVERY == 0:
+                            f.write(json.dumps(data) + '\n')
+                        else:
+                            f.write(json.dumps({"channel": "l2Delta", "data": previous.diff(book)}) + '\n')
+                        previous = book
+                        count += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[L2] Connection error: {e}, reconnecting")
+            await asyncio.sleep(1)
+
+# === Main ===
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    # python l2book.py BTC btc_l2.jsonl
+    coin = sys.argv[1] if len(sys.argv) > 1 else 'BTC'
+    path = sys.argv[2] if len(sys.argv) > 2 else f'{coin.lower()}_l2.jsonl'
+    try:
+        asyncio.run(record(coin, path))
+    except KeyboardInterrupt:
+        logger.info("[L2] Stopped")
+
+if __name__ == "__main__":
+    main()
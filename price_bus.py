@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import websockets
+
+# === Logging ===
+logger = logging.getLogger(__name__)
+
+# === Config ===
+PRICE_BUS_NAME = os.getenv('PRICE_BUS_NAME', 'hl_price_bus')
+RING_CAPACITY = 4096  # trades kept per coin
+MAGIC = b'8AMBUS02'
+COIN_NAME_SIZE = 16
+
+# === Layout ===
+# Header:  magic, coin count, ring capacity, producer pid, then one fixed-width name per coin.
+# Per coin: seqlock counter, trade count, latest trade, candle count, latest candle,
+#           padded to REGION_HEADER_SIZE, then a ring of RING_CAPACITY trades.
+# The single writer bumps the seqlock to odd before writing and back to even
+# after; readers retry when it is odd or changed, so nobody ever takes a lock.
+HEADER = struct.Struct('<8sIIQ')
+U64 = struct.Struct('<Q')
+TRADE = struct.Struct('<ddqq')            # px, sz, time ms, side (+1 buy / -1 sell)
+CANDLE = struct.Struct('<qddddd')         # open time ms, o, h, l, c, v
+SEQLOCK_OFFSET = 0
+TRADE_SEQ_OFFSET = 8
+LAST_TRADE_OFFSET = 16
+CANDLE_SEQ_OFFSET = LAST_TRADE_OFFSET + TRADE.size
+LAST_CANDLE_OFFSET = CANDLE_SEQ_OFFSET + 8
+REGION_HEADER_SIZE = 128
+
+def _region_size(capacity):
+    return REGION_HEADER_SIZE + capacity * TRADE.size
+
+def _layout(coins, capacity):
+    names_offset = HEADER.size
+    first_region = names_offset + len(coins) * COIN_NAME_SIZE
+    first_region += -first_region % 64
+    region = _region_size(capacity)
+    return {coin: first_region + i * region for i, coin in enumerate(coins)}, first_region + len(coins) * region
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        # Windows frees the segment with its last handle, so an existing one is always in use
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# Segments created by a writer in this process; their tracker registration must survive a local reader
+_CREATED = set()
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: stop the tracker unlinking the producer's segment on exit
+        shm = shared_memory.SharedMemory(name=name)
+        if shm._name not in _CREATED:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+# === Writer ===
+class PriceBusWriter:
+    """Single producer: owns the shared-memory segment and publishes trades and candles."""
+
+    def __init__(self, coins, name=PRICE_BUS_NAME, capacity=RING_CAPACITY):
+        self.coins = list(coins)
+        self.capacity = capacity
+        self.regions, size = _layout(self.coins, capacity)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Only take over a segment left behind by a producer that has exited
+            stale = _attach(name)
+            magic, _, _, pid = HEADER.unpack_from(stale.buf, 0)
+            stale.close()
+            if magic != MAGIC:
+                raise RuntimeError(f"Shared memory '{name}' exists but is not a price bus of this version; remove it or set PRICE_BUS_NAME")
+            if _pid_alive(pid):
+                raise RuntimeError(f"Price bus '{name}' is already published by running process {pid}")
+            logger.warning(f"[PriceBus] Replacing '{name}' left behind by exited process {pid}")
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _CREATED.add(self.shm._name)
+        self.buf = self.shm.buf
+        self.buf[:size] = bytes(size)
+        for i, coin in enumerate(self.coins):
+            struct.pack_into(f'{COIN_NAME_SIZE}s', self.buf, HEADER.size + i * COIN_NAME_SIZE, coin.encode())
+        HEADER.pack_into(self.buf, 0, MAGIC, len(self.coins), capacity, os.getpid())
+        self.seq = {coin: [0, 0, 0] for coin in self.coins}  # seqlock, trades, candles
+
+    def publish_trade(self, coin, px, sz, ts, side=0):
+        base = self.regions.get(coin)
+        if base is None:
+            return
+        seq = self.seq[coin]
+        buf = self.buf
+        seq[0] += 1
+        U64.pack_into(buf, base + SEQLOCK_OFFSET, seq[0])
+        TRADE.pack_into(buf, base + REGION_HEADER_SIZE + (seq[1] % self.capacity) * TRADE.size, px, sz, ts, side)
+        TRADE.pack_into(buf, base + LAST_TRADE_OFFSET, px, sz, ts, side)
+        seq[1] += 1
+        U64.pack_into(buf, base + TRADE_SEQ_OFFSET, seq[1])
+        seq[0] += 1
+        U64.pack_into(buf, base + SEQLOCK_OFFSET, seq[0])
+
+    def publish_candle(self, coin, candle):
+        base = self.regions.get(coin)
+        if base is None:
+            return
+        seq = self.seq[coin]
+        buf = self.buf
+        seq[0] += 1
+        U64.pack_into(buf, base + SEQLOCK_OFFSET, seq[0])
+        CANDLE.pack_into(buf, base + LAST_CANDLE_OFFSET, *candle[:6])
+        seq[2] += 1
+        U64.pack_into(buf, base + CANDLE_SEQ_OFFSET, seq[2])
+        seq[0] += 1
+        U64.pack_into(buf, base + SEQLOCK_OFFSET, seq[0])
+
+    def publish_message(self, data):
+        """Publish a decoded Hyperliquid `trades` or `candle` websocket message."""
+        channel = data.get("channel")
+        if channel == "trades":
+            for trade in data.get("data", []):
+                side = 1 if trade["side"] == 'B' else -1
+                self.publish_trade(trade["coin"], float(trade["px"]), float(trade["sz"]), int(trade["time"]), side)
+        elif channel == "candle":
+            c = data["data"]
+            self.publish_candle(c["s"], (int(c["t"]), float(c["o"]), float(c["h"]), float(c["l"]), float(c["c"]), float(c["v"])))
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+        _CREATED.discard(self.shm._name)
+
+# === Reader ===
+class PriceBusReader:
+    """Lock-free reader; any number of local processes can attach to the same bus."""
+
+    def __init__(self, name=PRICE_BUS_NAME):
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, n_coins, self.capacity, self.producer_pid = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory '{name}' is not a price bus")
+        coins = []
+        for i in range(n_coins):
+            raw, = struct.unpack_from(f'{COIN_NAME_SIZE}s', self.buf, HEADER.size + i * COIN_NAME_SIZE)
+            coins.append(raw.rstrip(b'\0').decode())
+        self.coins = coins
+        self.regions, _ = _layout(coins, self.capacity)
+
+    def _read(self, coin, fn):
+        # Seqlock read: retry until the writer was not mid-update around our copy
+        base = self.regions[coin]
+        buf = self.buf
+        while True:
+            before, = U64.unpack_from(buf, base + SEQLOCK_OFFSET)
+            if before & 1:
+                continue
+            value = fn(buf, base)
+            after, = U64.unpack_from(buf, base + SEQLOCK_OFFSET)
+            if before == after:
+                return value
+
+    def latest_trade(self, coin):
+        """Returns (trade_seq, px, sz, time_ms, side); trade_seq is 0 until the first trade."""
+        return self._read(coin, lambda buf, base: U64.unpack_from(buf, base + TRADE_SEQ_OFFSET) + TRADE.unpack_from(buf, base + LAST_TRADE_OFFSET))
+
+    def latest_candle(self, coin):
+        """Returns (candle_seq, [t, o, h, l, c, v]) in ccxt OHLCV order."""
+        seq, *candle = self._read(coin, lambda buf, base: U64.unpack_from(buf, base + CANDLE_SEQ_OFFSET) + CANDLE.unpack_from(buf, base + LAST_CANDLE_OFFSET))
+        return seq, candle
+
+    def trade_seq(self, coin):
+        return U64.unpack_from(self.buf, self.regions[coin] + TRADE_SEQ_OFFSET)[0]
+
+    def trades_since(self, coin, seq):
+        """Trades published after sequence `seq`: returns (new_seq, [(px, sz, time_ms, side), ...]).
+
+        If the reader fell a full ring behind, the oldest trades are gone and only
+        the last `capacity - 1` are returned; the oldest slot may be mid-overwrite.
+        """
+        base = self.regions[coin]
+        ring = base + REGION_HEADER_SIZE
+        capacity = self.capacity
+        end = self.trade_seq(coin)
+        start = max(seq, end - capacity)
+        trades = [TRADE.unpack_from(self.buf, ring + (i % capacity) * TRADE.size) for i in range(start, end)]
+        # Drop anything the writer overwrote (or is overwriting) while we were copying
+        lapped = self.trade_seq(coin) + 1 - capacity - start
+        if lapped > 0:
+            trades = trades[lapped:]
+        return end, trades
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+# === Producer ===
+async def run_producer(coins, interval='5m', mainnet=True):
+    """Standalone market-data process: one websocket feeding the bus for all coins."""
+    url = "wss://api.hyperliquid.xyz/ws" if mainnet else "wss://api.hyperliquid-testnet.xyz/ws"
+    bus = PriceBusWriter(coins)
+    try:
+        while True:
+            try:
+                async with websockets.connect(url) as ws:
+                    for coin in coins:
+                        await ws.send(json.dumps({"method": "subscribe", "subscription": {"type": "trades", "coin": coin}}))
+                        await ws.send(json.dumps({"method": "subscribe", "subscription": {"type": "candle", "coin": coin, "interval": interval}}))
+                    logger.info(f"[PriceBus] Publishing {', '.join(coins)} to '{PRICE_BUS_NAME}'")
+                    async for message in ws:
+                        bus.publish_message(json.loads(message))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[PriceBus] Connection error: {e}, reconnecting")
+            await asyncio.sleep(1)
+    finally:
+        bus.close()
+
+def watch(coin):
+    """Print new trades for a coin as they land on the bus."""
+    reader = PriceBusReader()
+    seq = reader.trade_seq(coin)
+    try:
+        while True:
+            seq, trades = reader.trades_since(coin, seq)
+            for px, sz, ts, side in trades:
+                print(f"{coin} {'BUY ' if side > 0 else 'SELL'} {sz} @ {px} ({ts})")
+            time.sleep(0.001)
+    finally:
+        reader.close()
+
+# === Main ===
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    # python price_bus.py BTC ETH       -> run the producer
+    # python price_bus.py --watch BTC   -> print trades read from the bus
+    args = sys.argv[1:]
+    if args and args[0] == '--watch':
+        watch(args[1] if len(args) > 1 else 'BTC')
+        return
+    try:
+        asyncio.run(run_producer(args or ['BTC']))
+    except KeyboardInterrupt:
+        logger.info("[PriceBus] Stopped")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import ccxt
-import time
 import logging
 from datetime import datetime, timedelta
 import pytz
@@ -8,6 +7,9 @@ import json
 import websockets
 import os
 from dotenv import load_dotenv
+import gateway
+from user_events import AccountState, user_subscriptions
+from price_bus import PriceBusWriter
 
 # === Logging ===
 logging.basicConfig(
@@ -18,9 +20,9 @@ logger = logging.getLogger(__name__)
 
 # === Constants ===
 IST = pytz.timezone('Asia/Kolkata')
-SYMBOL = 'BTC/USDC:USDC'
+SYMBOL_FORMAT = '{coin}/USDC:USDC'
 TIMEFRAME = '5m'
-LIMIT = 20
+LIMIT = 20  # candles kept per coin
 
 # === Trading Window ===
 START_HOUR = 8   # 8:00 AM IST
@@ -35,10 +37,11 @@ LEVERAGE = 40
 MAX_POSITION_VALUE = MARGIN * LEVERAGE  # $6000 max trade value
 
 # === Load environment variables ===
-# Make sure to create a .env file in this directory with WALLET_ADDRESS and PRIVATE_KEY
+# Make sure to create a .env file in this directory with WALLET_ADDRESS and PRIVATE_KEY (optionally COINS)
 load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
 WALLET_ADDRESS = os.getenv('WALLET_ADDRESS')
 PRIVATE_KEY = os.getenv('PRIVATE_KEY')
+COINS = [c.strip() for c in os.getenv('COINS', 'BTC').split(',') if c.strip()]  # e.g. COINS=BTC,ETH,SOL
 
 # === Exchange ===
 def init_exchange():
@@ -101,179 +104,276 @@ def find_entry_pattern(candles):
         }
     return None
 
-async def breakout_and_monitor_ws(dex, supermax, supermin, sl_losses, tp_count, coin="BTC", mainnet=True):
-    url = "wss://api.hyperliquid.xyz/ws" if mainnet else "wss://api.hyperliquid-testnet.xyz/ws"
-    entry = None
-    direction = None
-    trade_active = False
-    stop = None
-    target = None
-    range_ = None
-    qty = None
-    async with websockets.connect(url) as ws:
-        sub_msg = {
-            "method": "subscribe",
-            "subscription": {"type": "trades", "coin": coin}
-        }
-        # Globally subscribe why again and again
-        await ws.send(json.dumps(sub_msg))
-        logger.info(f"[WebSocket] Subscribed to trades for {coin}")
-        async for message in ws:
-            data = json.loads(message)
-            if data.get("channel") == "trades":
-                trades = data.get("data", [])
-                for trade in trades:
-                    price = float(trade["px"])
-                    now_time = datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S')
-                    # Remove noisy ticker logs
-                    # logger.info(f"[WebSocket] Trade price: {price}")
-                    if not trade_active:
-                        if price > supermax:
-                            direction = "LONG"
-                            entry = price
-                        elif price < supermin:
-                            direction = "SHORT"
-                            entry = price
-                        if direction and entry:
-                            logger.info(f"[WebSocket] Breakout {direction} at {entry}")
-                            # Calculate trade params
-                            range_ = supermax - supermin
-                            max_position_size = MAX_POSITION_VALUE
-                            max_qty = max_position_size / entry
-                            qty = min(RISK / range_, max_qty)
-                            # --- Correct SL/TP logic ---
-                            if direction == 'LONG':
-                                stop = entry - range_  #supermin
-                                target = entry + 4 * range_   # entry + 4*(entry - supermin)
-                            else:  # SHORT
-                                stop = entry + range_  #supermax
-                                target = entry - 4 * range_  # entry - 4*(supermax - entry)
-                            # === Place actual trade ===
-                            try:
-                                # can done by websocket ?
-                                order = dex.create_order(
-                                    SYMBOL,
-                                    "market",
-                                    "buy" if direction == "LONG" else "sell",
-                                    qty,
-                                    price=entry  # Use the breakout price as reference
-                                )
-                                logger.info(f"ORDER PLACED: {order}")
-                                # Place TP order
-                                tp_order = dex.create_order(
-                                    SYMBOL,
-                                    "limit",
-                                    "sell" if direction == "LONG" else "buy",
-                                    qty,
-                                    price=target
-                                )
-                                # Place SL order (stop)
-                                sl_order = dex.create_order(
-                                    SYMBOL,
-                                    "stop",
-                                    "sell" if direction == "LONG" else "buy",
-                                    qty,
-                                    price=stop
-                                )
-                                logger.info(f"TP ORDER: {tp_order}")
-                                logger.info(f"SL ORDER: {sl_order}")
-                            except Exception as e:
-                                logger.error(f"Order placement error: {e}")
-                                return sl_losses, tp_count
-                            # Save position info if needed
-                            position = {
-                                "direction": direction,
-                                "entry": entry,
-                                "qty": qty,
-                                "stop": stop,
-                                "target": target
-                            }
-                            trade_active = True
-                    else:
-                        # Remove noisy monitor logs
-                        # logger.info(f"[1s Monitor] {now_time} Price: {price:.2f}")
-                        if direction == 'LONG' and stop:
-                            if price <= stop:
-                                logger.info("❌ Stop loss hit")
-                                sl_losses += 1
-                                return sl_losses, tp_count
-                            elif target and price >= target:
-                                logger.info("✅ Take profit hit")
-                                tp_count += 1
-                                sl_losses = 0  # reset SL streak
-                                return sl_losses, tp_count
-                        else:
-                            if stop and price >= stop:
-                                logger.info("❌ Stop loss hit")
-                                sl_losses += 1
-                                return sl_losses, tp_count
-                            elif target and price <= target:
-                                logger.info("✅ Take profit hit")
-                                tp_count += 1
-                                sl_losses = 0
-                                return sl_losses, tp_count
-    return sl_losses, tp_count
+def symbol_for(coin):
+    return SYMBOL_FORMAT.format(coin=coin)
 
-# === Main Strategy ===
-def run_strategy(dex):
-    logger.info("Running breakout strategy")
+def parse_ws_candle(candle):
+    # Hyperliquid candle push -> ccxt OHLCV row
+    return [int(candle["t"]), float(candle["o"]), float(candle["h"]), float(candle["l"]), float(candle["c"]), float(candle["v"])]
 
-    sl_losses = 0
-    tp_count = 0
-    pattern_found = False
-    setup = None
+# === Execution ===
+class ExecutionClient:
+    """Single authenticated exchange client shared by every coin.
 
-    while True:
-        now = datetime.now(IST)
-
-        if not is_market_hours():
-            logger.info("Market closed. Sleeping 5 min.")
-            # change it to START HOUR , if not reset this variablws
-            time.sleep(300)
-            continue
-
-        # Check if we hit daily stop rule, we can move it bepw
-        if tp_count >= 1 or sl_losses >= 3:
-            logger.info(f"📛 DAILY STOP: TP count = {tp_count}, SL count = {sl_losses}")
-            time.sleep(300)
-            # change to wake up atSTART_HOUR
-            continue
-
-        session_start = now.replace(hour=START_HOUR, minute=START_MINUTE, second=0, microsecond=0) 
-        minutes_since_start = int((now - session_start).total_seconds() // 60)
-        if minutes_since_start < 0:
-            # Wait until session start
-            sleep_seconds = int((session_start - now).total_seconds())
-            logger.info(f"Waiting for session start at {session_start.strftime('%H:%M')}")
-            time.sleep(sleep_seconds)
-        else:
-            # Calculate minutes to next 5-min mark
-            mins_to_next = 5 - (minutes_since_start % 5)
-            next_candle_time = now + timedelta(minutes=mins_to_next)
-            sleep_seconds = (next_candle_time.replace(second=0, microsecond=0) - now).total_seconds()
-            logger.info(f"Waiting {int(sleep_seconds)} seconds for next 5-min candle close at {next_candle_time.strftime('%H:%M')}")
-            time.sleep(sleep_seconds)
-            # Then check for pattern
+    ccxt calls block, so they run in a worker thread; the lock keeps requests
+    (and their nonces) from the different coins strictly one at a time.
+    """
+
+    def __init__(self, dex):
+        self.dex = dex
+        self.lock = asyncio.Lock()
+
+    async def call(self, method, *args, **kwargs):
+        async with self.lock:
+            return await asyncio.to_thread(getattr(self.dex, method), *args, **kwargs)
+
+    async def create_order(self, symbol, type_, side, amount, price=None):
+        return await self.call('create_order', symbol, type_, side, amount, price=price)
+
+    def amount_to_precision(self, symbol, amount):
+        # Local market metadata only, no request; the exchange would round the same way
+        return float(self.dex.amount_to_precision(symbol, amount))
+
+    async def cancel_order(self, oid, symbol):
+        # Cancel the leg that did not fill so it cannot open a new position
+        try:
+            await self.call('cancel_order', oid, symbol)
+        except Exception as e:
+            logger.error(f"Cancel error for order {oid}: {e}")
+
+# === Market Data ===
+class MarketDataHub:
+    """One websocket for all coins: trades and candles per coin plus the user channels.
+
+    Public events are routed to the matching coin's queue. User events update the
+    shared `AccountState` once, and the coins they touch get a 'user' wake-up.
+    `connect` can be swapped for a fake (e.g. returning `user_events.FakeEventSource`).
+    With a `bus`, trades and candles are also written to the shared-memory price
+    bus so local consumers need no connection of their own.
+    """
+
+    def __init__(self, coins, account, mainnet=True, connect=websockets.connect, bus=None):
+        self.url = "wss://api.hyperliquid.xyz/ws" if mainnet else "wss://api.hyperliquid-testnet.xyz/ws"
+        self.queues = {coin: asyncio.Queue() for coin in coins}
+        self.account = account
+        self.connect = connect
+        self.bus = bus
+
+    def subscriptions(self):
+        subs = []
+        for coin in self.queues:
+            subs.append({"method": "subscribe", "subscription": {"type": "trades", "coin": coin}})
+            subs.append({"method": "subscribe", "subscription": {"type": "candle", "coin": coin, "interval": TIMEFRAME}})
+        return subs + user_subscriptions(WALLET_ADDRESS)
+
+    def dispatch(self, data):
+        channel = data.get("channel")
+        if self.bus is not None:
+            self.bus.publish_message(data)
+        if channel == "trades":
+            trades = data.get("data", [])
+            if trades and trades[0]["coin"] in self.queues:
+                self.queues[trades[0]["coin"]].put_nowait(('trades', trades))
+        elif channel == "candle":
+            candle = data["data"]
+            if candle["s"] in self.queues:
+                self.queues[candle["s"]].put_nowait(('candle', parse_ws_candle(candle)))
+        elif self.account.handle_message(data):
+            if channel == "userFills":
+                coins = {fill["coin"] for fill in data["data"].get("fills", [])}
+            else:
+                coins = {update["order"]["coin"] for update in data["data"]}
+            for coin in coins & self.queues.keys():
+                self.queues[coin].put_nowait(('user', None))
+
+    async def run(self):
+        backoff = 1
+        while True:
             try:
-                # Calculate timestamp for today at session start
-                start_dt = now.replace(hour=START_HOUR, minute=START_MINUTE, second=0, microsecond=0)
-                start_ts = int(start_dt.timestamp() * 1000)
-                candles = dex.fetch_ohlcv(SYMBOL, TIMEFRAME, since=start_ts, limit=LIMIT)  #fetching, why limit 20
-                setup = find_entry_pattern(candles)
-                if setup:
-                    pattern_found = True
-                    # Use websocket for both breakout and monitoring
-                    sl_losses, tp_count = asyncio.run(breakout_and_monitor_ws(dex, setup['supermax'], setup['supermin'], sl_losses, tp_count, coin="BTC"))
-                else:
-                    logger.info("No pattern yet, retrying in 1 min")
+                async with self.connect(self.url) as ws:
+                    for sub in self.subscriptions():
+                        await ws.send(json.dumps(sub))
+                    logger.info(f"[WebSocket] Subscribed to {', '.join(self.queues)} and user events")
+                    backoff = 1
+                    async for message in ws:
+                        self.dispatch(json.loads(message))
+                logger.warning("[WebSocket] Connection ended, reconnecting")
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Candle fetch error: {e}")
-            time.sleep(60)
+                logger.error(f"[WebSocket] Connection error: {e}, reconnecting in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+# === Per-coin Strategy ===
+class CoinStrategy:
+    """Breakout strategy for one coin, fed by its queue on the shared hub."""
+
+    def __init__(self, coin, queue, execution, account, market_data=None):
+        self.coin = coin
+        self.symbol = symbol_for(coin)
+        self.queue = queue
+        self.execution = execution
+        self.account = account
+        self.market_data = market_data
+        self.candles = []
+        self.day = None
+        self.sl_losses = 0
+        self.tp_count = 0
+        self.daily_pnl = 0.0
+
+    def log(self, msg, level=logging.INFO):
+        logger.log(level, f"[{self.coin}] {msg}")
+
+    def reset_if_new_day(self, now):
+        if now.date() != self.day:
+            self.day = now.date()
+            self.sl_losses = 0
+            self.tp_count = 0
+            self.daily_pnl = 0.0
+
+    def update_candle(self, candle):
+        """Store a candle push. Returns True when it opens a new candle, i.e. the previous one closed."""
+        if self.candles and self.candles[-1][0] == candle[0]:
+            self.candles[-1] = candle
+            return False
+        self.candles.append(candle)
+        del self.candles[:-LIMIT]
+        return len(self.candles) > 1
+
+    async def backfill(self):
+        # Seed recent candles so a pattern can be found right after a restart
+        if self.market_data is None:
+            return
+        since = int((datetime.now(IST) - timedelta(minutes=15)).timestamp() * 1000)
+        try:
+            candles = await asyncio.to_thread(self.market_data.fetch_ohlcv, self.symbol, TIMEFRAME, since=since, limit=LIMIT)
+            for candle in candles:
+                self.update_candle(candle)
+        except Exception as e:
+            self.log(f"Candle backfill error: {e}", logging.ERROR)
+
+    async def run(self):
+        await self.backfill()
+        while True:
+            kind, payload = await self.queue.get()
+            if kind != 'candle' or not self.update_candle(payload):
+                continue
+            now = datetime.now(IST)
+            self.reset_if_new_day(now)
+            if not is_market_hours():
+                continue
+            if self.tp_count >= 1 or self.sl_losses >= 3:
+                continue
+            setup = find_entry_pattern(self.candles)
+            if setup:
+                self.log(f"Pattern at {setup['timestamp']}: supermax {setup['supermax']}, supermin {setup['supermin']}")
+                await self.trade(setup['supermax'], setup['supermin'])
+                if self.tp_count >= 1 or self.sl_losses >= 3:
+                    self.log(f"📛 DAILY STOP: TP count = {self.tp_count}, SL count = {self.sl_losses}, PnL = {self.daily_pnl:.2f}")
+
+    async def wait_for_breakout(self, supermax, supermin):
+        while True:
+            kind, payload = await self.queue.get()
+            if kind == 'candle':
+                self.update_candle(payload)
+            elif kind == 'trades':
+                for trade in payload:
+                    price = float(trade["px"])
+                    if price > supermax:
+                        return "LONG", price
+                    if price < supermin:
+                        return "SHORT", price
+
+    async def trade(self, supermax, supermin):
+        """Enter on breakout, then wait for the TP or SL order to actually fill."""
+        direction, entry = await self.wait_for_breakout(supermax, supermin)
+        self.log(f"[WebSocket] Breakout {direction} at {entry}")
+        # Calculate trade params
+        range_ = supermax - supermin
+        max_position_size = MAX_POSITION_VALUE
+        max_qty = max_position_size / entry
+        # Round once to the size step so the orders and the tracked size agree with the fills
+        try:
+            qty = self.execution.amount_to_precision(self.symbol, min(RISK / range_, max_qty))
+        except Exception as e:
+            self.log(f"Order size error: {e}", logging.ERROR)
+            return
+        # --- Correct SL/TP logic ---
+        if direction == 'LONG':
+            stop = entry - range_  #supermin
+            target = entry + 4 * range_   # entry + 4*(entry - supermin)
+        else:  # SHORT
+            stop = entry + range_  #supermax
+            target = entry - 4 * range_  # entry - 4*(supermax - entry)
+        entry_side = "buy" if direction == "LONG" else "sell"
+        exit_side = "sell" if direction == "LONG" else "buy"
+        # === Place actual trade ===
+        try:
+            order = await self.execution.create_order(self.symbol, "market", entry_side, qty, price=entry)
+            self.log(f"ORDER PLACED: {order}")
+            tp_order = await self.execution.create_order(self.symbol, "limit", exit_side, qty, price=target)
+            sl_order = await self.execution.create_order(self.symbol, "stop", exit_side, qty, price=stop)
+            self.log(f"TP ORDER: {tp_order}")
+            self.log(f"SL ORDER: {sl_order}")
+        except Exception as e:
+            self.log(f"Order placement error: {e}", logging.ERROR)
+            return
+        entry_oid, tp_oid, sl_oid = order['id'], tp_order['id'], sl_order['id']
+        for oid in (entry_oid, tp_oid, sl_oid):
+            self.account.track(oid, self.coin, qty)
+        while True:
+            if self.account.is_filled(tp_oid):
+                pnl = self.account.net_pnl(entry_oid, tp_oid)
+                self.log(f"✅ Take profit filled, PnL {pnl:.2f}")
+                await self.execution.cancel_order(sl_oid, self.symbol)
+                self.tp_count += 1
+                self.sl_losses = 0  # reset SL streak
+                self.daily_pnl += pnl
+                return
+            if self.account.is_filled(sl_oid):
+                pnl = self.account.net_pnl(entry_oid, sl_oid)
+                self.log(f"❌ Stop loss filled, PnL {pnl:.2f}")
+                await self.execution.cancel_order(tp_oid, self.symbol)
+                self.sl_losses += 1
+                self.daily_pnl += pnl
+                return
+            kind, payload = await self.queue.get()
+            if kind == 'candle':
+                self.update_candle(payload)
+
+async def run_coin(strategy):
+    # A failing coin is logged and restarted without touching the others
+    while True:
+        try:
+            await strategy.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"[{strategy.coin}] Strategy crashed, restarting in 5s")
+            await asyncio.sleep(5)
+
+# === Main Strategy ===
+async def run_strategy(dex, market_data, coins=COINS, connect=websockets.connect, bus=None):
+    logger.info(f"Running breakout strategy for {', '.join(coins)}")
+    account = AccountState()
+    execution = ExecutionClient(dex)
+    hub = MarketDataHub(coins, account, connect=connect, bus=bus)
+    strategies = [CoinStrategy(coin, hub.queues[coin], execution, account, market_data) for coin in coins]
+    await asyncio.gather(hub.run(), *(run_coin(strategy) for strategy in strategies))
 
 # === Main ===
 def main():
     dex = init_exchange()
-    run_strategy(dex)
+    # Candles come through the shared gateway when one is running
+    market_data = gateway.get_exchange('hyperliquid')
+    # With PUBLISH_PRICE_BUS=1 the bot is also the price-bus producer
+    bus = PriceBusWriter(COINS) if os.getenv('PUBLISH_PRICE_BUS') == '1' else None
+    try:
+        asyncio.run(run_strategy(dex, market_data, bus=bus))
+    finally:
+        if bus is not None:
+            bus.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,145 @@
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from candle_store import open_candle_store, save_candles
+
+# === Config ===
+IST = pytz.timezone('Asia/Kolkata')
+TIMEFRAME_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000}
+DAY_MS = 86_400_000
+YEAR_MS = 365 * DAY_MS
+CHUNK = 1_000_000  # bars generated per vectorized step
+
+DEFAULTS = {
+    'price': 100_000.0,        # first open
+    'drift': 0.0,              # annualized drift of log price (median growth rate)
+    'vol_regimes': (0.3, 0.6, 1.2),   # annualized vols, one picked per day
+    'regime_probs': (0.5, 0.35, 0.15),
+    'jump_rate': 0.0005,       # jumps per bar
+    'jump_std': 0.01,          # log-size of a jump
+    'doji_day_prob': 0.05,     # share of days that are doji-heavy
+    'doji_bar_prob': 0.4,      # share of bars with close == open on those days
+    'gap_day_prob': 0.05,      # share of days that are gap-heavy
+    'gap_bar_prob': 0.2,       # share of bars opening away from the previous close on those days
+    'gap_std': 0.002,          # log-size of an opening gap
+    'missing_prob': 0.001,     # share of bars dropped from the output
+    'tick_size': 0.1,
+    'base_volume': 50.0,
+}
+
+# === Generator ===
+def _generate_chunk(rng, first_bar, n_bars, last_close, start_ts, tf_ms, day_regimes, params):
+    """Generate `n_bars` consecutive bars as (ts, o, h, l, c, v) columns; returns them and the last close."""
+    bars = np.arange(first_bar, first_bar + n_bars)
+    ts = start_ts + bars * tf_ms
+    day = (bars * tf_ms) // DAY_MS
+    dt = tf_ms / YEAR_MS
+    regime = day_regimes[day]
+    sigma = np.asarray(params['vol_regimes'])[regime['vol']] * np.sqrt(dt)
+
+    # Log return inside each bar: log drift plus diffusion (sigma is already per bar),
+    # plus compound-Poisson jumps; a log drift needs no -sigma^2/2 correction
+    ret = params['drift'] * dt + sigma * rng.standard_normal(n_bars)
+    n_jumps = rng.poisson(params['jump_rate'], n_bars)
+    ret += np.sqrt(n_jumps) * params['jump_std'] * rng.standard_normal(n_bars)
+    doji = regime['doji'] & (rng.random(n_bars) < params['doji_bar_prob'])
+    ret[doji] = 0.0
+
+    # Opening gaps move the open away from the previous close
+    gapped = regime['gap'] & (rng.random(n_bars) < params['gap_bar_prob'])
+    gap = np.where(gapped, params['gap_std'] * rng.standard_normal(n_bars), 0.0)
+
+    log_close = np.log(last_close) + np.cumsum(gap + ret)
+    log_open = log_close - ret
+    # High/low from the exact max/min distribution of a Brownian bridge between open and close
+    b2 = ret ** 2
+    up = 0.5 * (ret + np.sqrt(b2 - 2 * sigma ** 2 * np.log(rng.random(n_bars))))
+    down = 0.5 * (ret - np.sqrt(b2 - 2 * sigma ** 2 * np.log(rng.random(n_bars))))
+    up[doji] *= rng.random(doji.sum())  # keep doji wicks short
+    down[doji] *= rng.random(doji.sum())
+
+    tick = params['tick_size']
+    open_ = np.round(np.exp(log_open) / tick) * tick
+    close = np.where(doji, open_, np.round(np.exp(log_close) / tick) * tick)
+    high = np.maximum(np.round(np.exp(log_open + up) / tick) * tick, np.maximum(open_, close))
+    low = np.minimum(np.round(np.exp(log_open + down) / tick) * tick, np.minimum(open_, close))
+    volume = params['base_volume'] * rng.lognormal(0.0, 0.5, n_bars) * (1 + np.abs(ret) / sigma)
+    return (ts, open_, high, low, close, volume), float(np.exp(log_close[-1]))
+
+def _day_regimes(rng, n_days, params):
+    regimes = np.zeros(n_days, dtype=[('vol', np.int64), ('doji', bool), ('gap', bool)])
+    regimes['vol'] = rng.choice(len(params['vol_regimes']), size=n_days, p=params['regime_probs'])
+    regimes['doji'] = rng.random(n_days) < params['doji_day_prob']
+    regimes['gap'] = rng.random(n_days) < params['gap_day_prob']
+    return regimes
+
+def _plan(n_bars, start=None, timeframe='5m', seed=None, chunk=CHUNK, **overrides):
+    """Draw the per-day regimes and missing-bar mask up front; returns (row count, chunk generator)."""
+    params = dict(DEFAULTS, **overrides)
+    rng = np.random.default_rng(seed)
+    tf_ms = TIMEFRAME_MS[timeframe]
+    start = start or IST.localize(datetime(2025, 1, 1))
+    start_ts = int(start.timestamp() * 1000)
+    day_regimes = _day_regimes(rng, (n_bars * tf_ms) // DAY_MS + 1, params)
+    keep = rng.random(n_bars) >= params['missing_prob']
+
+    def chunks():
+        last_close = params['price']
+        for first in range(0, n_bars, chunk):
+            n = min(chunk, n_bars - first)
+            cols, last_close = _generate_chunk(rng, first, n, last_close, start_ts, tf_ms, day_regimes, params)
+            yield np.column_stack(cols)[keep[first:first + n]]
+
+    return int(keep.sum()), chunks()
+
+def iter_candles(n_bars, **kwargs):
+    """Yield synthetic candles as (k, 6) float64 arrays in ccxt OHLCV order, `chunk` bars at a time.
+
+    Missing bars are dropped, so timestamps have holes and a chunk may hold
+    fewer than `chunk` rows. Keyword overrides replace entries of `DEFAULTS`.
+    """
+    return _plan(n_bars, **kwargs)[1]
+
+def generate_candles(n_bars, **kwargs):
+    """Generate all candles in memory; see `iter_candles` for parameters."""
+    chunks = list(iter_candles(n_bars, **kwargs))
+    return np.concatenate(chunks) if chunks else np.empty((0, 6))
+
+def write_candles(path, n_bars, **kwargs):
+    """Write synthetic candles into a candle store; `.npy` stores are filled one chunk at a time."""
+    if str(path).endswith('.csv'):
+        candles = generate_candles(n_bars, **kwargs)
+        save_candles(path, candles)
+        return len(candles)
+    rows, chunks = _plan(n_bars, **kwargs)
+    store = open_candle_store(path, rows)
+    filled = 0
+    for chunk in chunks:
+        store[filled:filled + len(chunk)] = chunk
+        filled += len(chunk)
+    store.flush()
+    return rows
+
+# === Main ===
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic OHLCV candles to a candle store (.npy or .csv)")
+    parser.add_argument('path')
+    parser.add_argument('--bars', type=int, default=100_000)
+    parser.add_argument('--timeframe', default='5m', choices=sorted(TIMEFRAME_MS))
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--price', type=float, default=DEFAULTS['price'])
+    parser.add_argument('--doji-day-prob', type=float, default=DEFAULTS['doji_day_prob'])
+    parser.add_argument('--gap-day-prob', type=float, default=DEFAULTS['gap_day_prob'])
+    parser.add_argument('--missing-prob', type=float, default=DEFAULTS['missing_prob'])
+    args = parser.parse_args()
+    rows = write_candles(
+        args.path, args.bars, timeframe=args.timeframe, seed=args.seed, price=args.price,
+        doji_day_prob=args.doji_day_prob, gap_day_prob=args.gap_day_prob, missing_prob=args.missing_prob,
+    )
+    print(f"Wrote {rows} candles to {args.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+
+# === Logging ===
+logger = logging.getLogger(__name__)
+
+def user_subscriptions(user):
+    """Subscription messages for the private fill and order-update channels."""
+    return [
+        {"method": "subscribe", "subscription": {"type": "userFills", "user": user}},
+        {"method": "subscribe", "subscription": {"type": "orderUpdates", "user": user}},
+    ]
+
+# === Order / Position Book ===
+class AccountState:
+    """In-memory order and position book maintained from Hyperliquid push events.
+
+    `orderUpdates` messages keep the status of each order by oid, `userFills`
+    messages update filled size, net position per coin and realized PnL. Fills
+    are de-duplicated by `tid`. The very first `userFills` snapshot only marks
+    historical fills as seen; snapshots after a reconnect are applied, so fills
+    that happened while the connection was down are not lost. `orderUpdates`
+    sends no snapshot, so an order also counts as filled once its fills add up
+    to its original size.
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self.positions = {}
+        self.fills = []
+        self.seen_tids = set()
+        self.synced = False
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+
+    def track(self, oid, coin, sz):
+        """Register an order we just placed, so its fills can settle it before any order update."""
+        book_order = self.orders.setdefault(str(oid), {'filled': 0.0, 'pnl': 0.0, 'fee': 0.0, 'status': 'open'})
+        book_order.setdefault('coin', coin)
+        book_order.setdefault('orig_sz', float(sz))
+
+    def handle_message(self, data):
+        """Apply one decoded websocket message. Returns the channel if it was a user event."""
+        channel = data.get("channel")
+        if channel == "userFills":
+            self.apply_fills(data.get("data", {}))
+        elif channel == "orderUpdates":
+            self.apply_order_updates(data.get("data", []))
+        else:
+            return None
+        return channel
+
+    def apply_order_updates(self, updates):
+        for update in updates:
+            order = update["order"]
+            oid = str(order["oid"])
+            book_order = self.orders.setdefault(oid, {'filled': 0.0, 'pnl': 0.0, 'fee': 0.0})
+            book_order.update({
+                'coin': order["coin"],
+                'side': order["side"],
+                'px': float(order["limitPx"]),
+                'sz': float(order["sz"]),
+                'orig_sz': float(order.get("origSz", order["sz"])),
+                'status': update["status"],
+                'timestamp': update.get("statusTimestamp"),
+            })
+
+    def apply_fills(self, data):
+        baseline = data.get("isSnapshot") and not self.synced
+        self.synced = True
+        for fill in data.get("fills", []):
+            tid = fill.get("tid")
+            if tid is not None:
+                if tid in self.seen_tids:
+                    continue
+                self.seen_tids.add(tid)
+            if baseline:
+                continue
+            oid = str(fill["oid"])
+            coin = fill["coin"]
+            sz = float(fill["sz"])
+            pnl = float(fill.get("closedPnl", 0))
+            fee = float(fill.get("fee", 0))
+            signed = sz if fill["side"] == 'B' else -sz
+            self.positions[coin] = self.positions.get(coin, 0.0) + signed
+            self.realized_pnl += pnl
+            self.fees += fee
+            book_order = self.orders.setdefault(oid, {'filled': 0.0, 'pnl': 0.0, 'fee': 0.0, 'coin': coin, 'status': 'open'})
+            book_order['filled'] += sz
+            book_order['pnl'] += pnl
+            book_order['fee'] += fee
+            book_order['avg_px'] = float(fill["px"])
+            self.fills.append(fill)
+
+    def status(self, oid):
+        order = self.orders.get(str(oid))
+        return order['status'] if order else None
+
+    def is_filled(self, oid):
+        order = self.orders.get(str(oid))
+        if not order:
+            return False
+        if order.get('status') == 'filled':
+            return True
+        orig_sz = order.get('orig_sz')
+        return bool(orig_sz) and order['filled'] >= orig_sz * (1 - 1e-9)
+
+    def net_pnl(self, *oids):
+        """Realized PnL minus fees over the given orders."""
+        total = 0.0
+        for oid in oids:
+            order = self.orders.get(str(oid))
+            if order:
+                total += order['pnl'] - order['fee']
+        return total
+
+    def position(self, coin):
+        return self.positions.get(coin, 0.0)
+
+# === Fake event source ===
+class FakeEventSource:
+    """Stands in for a websocket connection: records sent messages, yields queued ones.
+
+    Push dicts (or raw JSON strings) with `push`; iteration ends after `close`.
+    Also usable as `async with`, so it can be returned from a fake `connect`
+    to drive the live runner offline from scripted or recorded events.
+    """
+
+    def __init__(self, messages=()):
+        self.sent = []
+        self.queue = asyncio.Queue()
+        for message in messages:
+            self.push(message)
+
+    def push(self, message):
+        if not isinstance(message, str):
+            message = json.dumps(message)
+        self.queue.put_nowait(message)
+
+    def close(self):
+        self.queue.put_nowait(None)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.queue.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message